@@ -0,0 +1,87 @@
+"""
+Shared Redis and JSON helpers for the test scripts.
+Holds the channel names, client setup and error reporting that every script needs.
+"""
+
+import asyncio
+import functools
+import redis
+import redis.asyncio
+import signal
+import sys
+
+try:
+    import orjson
+
+    loads = orjson.loads
+    dumps = orjson.dumps
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def dumps_pretty(obj):
+        """Encode obj as indented JSON bytes."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:  # fall back to the stdlib json module when orjson is unavailable
+    import json
+
+    loads = json.loads
+    # json.loads(bytes) raises UnicodeDecodeError on invalid UTF-8, which is not a
+    # json.JSONDecodeError; both subclass ValueError, as does orjson.JSONDecodeError
+    JSONDecodeError = ValueError
+
+    def dumps(obj):
+        """Encode obj as JSON bytes."""
+        return json.dumps(obj).encode("utf-8")
+
+    def dumps_pretty(obj):
+        """Encode obj as indented JSON bytes."""
+        return json.dumps(obj, indent=2).encode("utf-8")
+
+# Channel the market maker listens on for configuration updates
+CONFIG_CHANNEL = "mm_config"
+
+# Channel the market maker publishes position summaries on
+POSITION_CHANNEL = "mm_position_updates"
+
+# Clients created by this process, keyed by URL, so repeated calls reuse one pool
+_clients = {}
+
+def get_client(redis_url):
+    """Return the Redis client for redis_url, creating it on first use."""
+    client = _clients.get(redis_url)
+    if client is None:
+        print(f"Connecting to Redis at {redis_url}")
+        client = _clients[redis_url] = redis.Redis.from_url(redis_url)
+    return client
+
+def connect_async(redis_url, **kwargs):
+    """Create an asyncio Redis client for redis_url.
+
+    Async clients are bound to the event loop they first run on, so they are not cached.
+    """
+    print(f"Connecting to Redis at {redis_url}")
+    return redis.asyncio.from_url(redis_url, **kwargs)
+
+def cancel_on_signals(task):
+    """Cancel task on SIGINT or SIGTERM (e.g. docker stop) so its cleanup still runs."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except NotImplementedError:
+            # Windows event loops don't support add_signal_handler; fall back to a plain
+            # handler that hands the cancellation to the loop
+            signal.signal(sig, lambda signum, frame: loop.call_soon_threadsafe(task.cancel))
+
+def report_errors(func):
+    """Decorate a script's main function so errors are printed to stderr and turned into False."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except redis.exceptions.ConnectionError as e:
+            print(f"Error connecting to Redis: {e}", file=sys.stderr)
+            return False
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False
+    return wrapper
@@ -4,68 +4,137 @@ Script to listen for configuration messages on the mm_config channel.
 This helps diagnose if Redis pub/sub is working correctly.
 """
 
-import redis
+import asyncio
 import argparse
 import sys
-import signal
-import json
+from typing import Annotated, Optional
 
+from _mm_redis import CONFIG_CHANNEL, cancel_on_signals, connect_async, loads, report_errors
+
+try:
+    import msgspec
+except ImportError:  # configs are only parsed, not validated, without msgspec
+    msgspec = None
+
+if msgspec is not None:
+    # Integer ranges of the Rust field types, so out-of-range values are reported too
+    U16 = Annotated[int, msgspec.Meta(ge=0, le=2**16 - 1)]
+    # msgspec only accepts bounds that fit in an int64, so u64 is checked for its lower bound
+    U64 = Annotated[int, msgspec.Meta(ge=0)]
+
+    class QuoteLevel(msgspec.Struct):
+        """A single quote level, mirroring QuoteLevel in enhanced_market_maker.rs."""
+        level: U16
+        spread_multiplier: float
+        size_multiplier: float
+
+    class Config(msgspec.Struct):
+        """Market maker configuration, mirroring MarketMakerConfig in enhanced_market_maker.rs."""
+        symbol: str
+        daily_return_bps: U16
+        notional_per_side: float
+        daily_pnl_stop_loss: float
+        trailing_take_profit: float
+        trailing_stop_loss: float
+        hedge_only_mode: bool
+        force_quote_refresh_interval: U64
+        max_long_usd: float
+        max_short_usd: float
+        enable_trading: bool = True
+        quote_levels: list[QuoteLevel] = msgspec.field(
+            default_factory=lambda: [QuoteLevel(level=1, spread_multiplier=1.0, size_multiplier=1.0)]
+        )
+        vault_address: Optional[str] = None
+
+    # Built once so the schema is compiled once rather than per message
+    _config_decoder = msgspec.json.Decoder(Config)
+else:
+    _config_decoder = None
+
+def parse_config(data):
+    """Parse a raw config payload into a dict of its fields.
+
+    When msgspec is installed the payload is decoded once straight into a typed Config,
+    so messages the market maker would reject are reported. Raises ValueError if the
+    payload is not a JSON object.
+    """
+    if _config_decoder is not None:
+        try:
+            # Fields the message omitted show the schema defaults the market maker would
+            # apply, and quote levels show as QuoteLevel structs; this avoids a second parse
+            return msgspec.structs.asdict(_config_decoder.decode(data))
+        except msgspec.ValidationError as e:
+            print(f"Configuration does not match the market maker schema: {e}")
+    # Only reached without msgspec or for payloads that failed validation
+    config = loads(data)
+    if not isinstance(config, dict):
+        raise ValueError("configuration payload is not a JSON object")
+    return config
+
+async def consume_configs(r):
+    """Subscribe to config updates on the async client r and print them until cancelled.
+
+    Several consumers can share one event loop and client, e.g. via asyncio.gather.
+    """
+    # Create a pubsub instance
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    
+    # Subscribe to the mm_config channel
+    await pubsub.subscribe(CONFIG_CHANNEL)
+    print(f"Subscribed to {CONFIG_CHANNEL} channel, listening for messages...")
+    
+    try:
+        # Listen for messages; subscribe acknowledgements are filtered out by redis-py
+        async for message in pubsub.listen():
+            data = message["data"]
+            # Invalid UTF-8 is rejected by the parser below, so don't fail on it here
+            print(f"Received message: {data.decode('utf-8', errors='replace')}")
+            
+            # Try to parse as JSON for prettier display; the parser takes the raw
+            # bytes and validates UTF-8 itself, so no separate decode is needed
+            try:
+                config = parse_config(data)
+                print("Parsed configuration:")
+                for key, value in config.items():
+                    print(f"  {key}: {value}")
+            except ValueError:  # JSON, UTF-8 and msgspec decode errors all derive from ValueError
+                print("Could not parse message as a JSON object")
+            
+            print("-" * 50)
+    finally:
+        # Drop the subscription and release the connection straight away
+        await pubsub.aclose()
+
+async def _listen(redis_url):
+    """Run consume_configs until Ctrl+C or SIGTERM (e.g. docker stop)."""
+    # Connect to Redis
+    r = connect_async(redis_url)
+    
+    # Cancel the listener on SIGINT/SIGTERM so the finally blocks release the connection
+    cancel_on_signals(asyncio.current_task())
+    
+    try:
+        await consume_configs(r)
+    except asyncio.CancelledError:
+        print("\nExiting...")
+    finally:
+        await r.aclose()
+
+@report_errors
 def listen_for_configs(redis_url):
     """Connect to Redis and listen for config updates."""
-    try:
-        # Connect to Redis
-        print(f"Connecting to Redis at {redis_url}")
-        r = redis.Redis.from_url(redis_url)
-        
-        # Test Redis connection
-        r.ping()
-        print("Connected to Redis successfully")
-        
-        # Create a pubsub instance
-        pubsub = r.pubsub()
-        
-        # Subscribe to the mm_config channel
-        pubsub.subscribe("mm_config")
-        print("Subscribed to mm_config channel, listening for messages...")
-        
-        # Set up signal handler for clean exit
-        def signal_handler(sig, frame):
-            print("\nExiting...")
-            pubsub.unsubscribe()
-            sys.exit(0)
-        
-        signal.signal(signal.SIGINT, signal_handler)
-        
-        # Listen for messages
-        for message in pubsub.listen():
-            if message["type"] == "message":
-                data = message["data"].decode("utf-8")
-                print(f"Received message: {data}")
-                
-                # Try to parse as JSON for prettier display
-                try:
-                    config = json.loads(data)
-                    print("Parsed configuration:")
-                    for key, value in config.items():
-                        print(f"  {key}: {value}")
-                except json.JSONDecodeError:
-                    print("Could not parse message as JSON")
-                
-                print("-" * 50)
-        
-        return True
-    except redis.exceptions.ConnectionError as e:
-        print(f"Error connecting to Redis: {e}", file=sys.stderr)
-        return False
-    except Exception as e:
-        print(f"Error: {e}", file=sys.stderr)
-        return False
+    asyncio.run(_listen(redis_url))
+    return True
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Parse command line arguments and run the script, returning the exit code."""
     parser = argparse.ArgumentParser(description="Listen for configurations on mm_config channel")
     parser.add_argument("--redis-url", default="redis://localhost:6379", help="Redis URL")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     success = listen_for_configs(args.redis_url)
-    sys.exit(0 if success else 1) 
\ No newline at end of file
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
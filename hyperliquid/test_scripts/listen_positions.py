@@ -4,63 +4,104 @@ Script to listen for position updates from the market maker on Redis.
 This simulates what the UI would do to display real-time position data.
 """
 
-import json
 import argparse
-import redis
+import asyncio
 import sys
 import time
 
-def listen_for_positions(redis_url, timeout=60):
-    """Connect to Redis and listen for position updates."""
+from _mm_redis import POSITION_CHANNEL, JSONDecodeError, cancel_on_signals, connect_async, dumps_pretty, loads, report_errors
+
+# Flush buffered output at least this often while draining a burst of updates
+FLUSH_EVERY = 100
+
+def handle_position_update(data, pretty=False):
+    """Write a single position update payload to stdout without flushing.
+
+    By default the payload bytes are written as received, one update per line. With
+    pretty=True the payload is parsed and re-encoded with indentation for reading.
+    """
+    out = sys.stdout.buffer
+    if pretty:
+        try:
+            data = dumps_pretty(loads(data))
+        except JSONDecodeError:
+            out.write(b"Received non-JSON data: " + data + b"\n")
+            return
+        out.write(b"\nReceived position update:\n")
+    out.write(data)
+    out.write(b"\n")
+
+async def consume_positions(r, timeout=60, pretty=False):
+    """Subscribe to position updates on the async client r and print them until timeout.
+
+    Several consumers can share one event loop and client, e.g. via asyncio.gather.
+    """
+    # Subscribe to the position updates channel
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(POSITION_CHANNEL)
+    print(f"Subscribed to {POSITION_CHANNEL} channel")
+    print(f"Listening for position updates for {timeout} seconds...")
+    # Updates are written to the underlying binary buffer, so push out pending text first
+    sys.stdout.flush()
+    
     try:
-        # Connect to Redis
-        print(f"Connecting to Redis at {redis_url}")
-        r = redis.Redis.from_url(redis_url)
-        
-        # Test Redis connection
-        r.ping()
-        print("Connected to Redis successfully")
-        
-        # Subscribe to the position updates channel
-        pubsub = r.pubsub()
-        pubsub.subscribe("mm_position_updates")
-        print(f"Subscribed to mm_position_updates channel")
-        print(f"Listening for position updates for {timeout} seconds...")
+        # Compute the deadline once; monotonic time is immune to wall-clock jumps
+        deadline = time.monotonic() + timeout
         
-        # Start time for timeout
-        start_time = time.time()
-        
-        # Listen for messages until timeout
-        while time.time() - start_time < timeout:
-            message = pubsub.get_message(timeout=1)
-            if message and message["type"] == "message":
-                data = message["data"].decode("utf-8")
-                try:
-                    position_data = json.loads(data)
-                    print("\nReceived position update:")
-                    print(json.dumps(position_data, indent=2))
-                except json.JSONDecodeError:
-                    print(f"Received non-JSON data: {data}")
-            time.sleep(0.1)
-        
-        print("\nTimeout reached. Exiting.")
+        # Listen for messages until timeout, checking the clock once per wake rather than per message
+        while time.monotonic() < deadline:
+            message = await pubsub.get_message(timeout=1.0)
+            # Drain everything already buffered before blocking again
+            pending = 0
+            while message:
+                handle_position_update(message["data"], pretty)
+                pending += 1
+                if pending >= FLUSH_EVERY:
+                    sys.stdout.flush()
+                    pending = 0
+                message = await pubsub.get_message(timeout=0)
+            if pending:
+                sys.stdout.flush()
+    finally:
+        # Drop the subscription and release the connection straight away
+        await pubsub.aclose()
+
+async def _listen(redis_url, timeout, pretty):
+    """Run consume_positions, returning False if it was stopped by Ctrl+C or SIGTERM."""
+    # Connect to Redis, reading large chunks so a burst of updates is pulled in with few recv() calls
+    r = connect_async(redis_url, socket_read_size=65536)
+    
+    # Cancel the listener on SIGINT/SIGTERM (e.g. docker stop) so the connection is released
+    cancel_on_signals(asyncio.current_task())
+    
+    try:
+        await consume_positions(r, timeout, pretty)
         return True
-    except redis.exceptions.ConnectionError as e:
-        print(f"Error connecting to Redis: {e}", file=sys.stderr)
+    except asyncio.CancelledError:
         return False
-    except KeyboardInterrupt:
+    finally:
+        await r.aclose()
+
+@report_errors
+def listen_for_positions(redis_url, timeout=60, pretty=False):
+    """Connect to Redis and listen for position updates."""
+    if asyncio.run(_listen(redis_url, timeout, pretty)):
+        print("\nTimeout reached. Exiting.")
+    else:
         print("\nListener stopped by user")
-        return True
-    except Exception as e:
-        print(f"Error: {e}", file=sys.stderr)
-        return False
+    return True
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Parse command line arguments and run the script, returning the exit code."""
     parser = argparse.ArgumentParser(description="Listen for position updates from market maker")
     parser.add_argument("--redis-url", default="redis://localhost:6379", help="Redis URL")
     parser.add_argument("--timeout", type=int, default=60, help="Listen timeout in seconds")
+    parser.add_argument("--pretty", action="store_true", help="Pretty-print each update instead of writing raw JSON lines")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
-    success = listen_for_positions(args.redis_url, args.timeout)
-    sys.exit(0 if success else 1) 
\ No newline at end of file
+    success = listen_for_positions(args.redis_url, args.timeout, args.pretty)
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
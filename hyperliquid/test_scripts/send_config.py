@@ -4,84 +4,113 @@ Script to send a test configuration update to the market maker via Redis.
 This simulates what the UI would do when a user updates configuration.
 """
 
-import json
 import argparse
-import redis
+import functools
 import sys
 
-def send_config(redis_url, symbol="BTC", num_levels=1, enable_trading=False, vault_address=None):
-    """Connect to Redis and set a test configuration directly in Redis."""
-    try:
-        # Generate quote levels based on num_levels
-        quote_levels = []
-        for i in range(1, num_levels + 1):
-            # For each level, increase the spread and potentially the size
-            quote_levels.append({
-                "level": i,
-                "spread_multiplier": i * 1.0,  # Level 1: 1.0x, Level 2: 2.0x, etc.
-                "size_multiplier": 1.5 / i     # Level 1: 1.5x, Level 2: 0.75x, Level 3: 0.5x, etc.
-            })
-            
-        # Sample configuration
-        config = {
-            "symbol": symbol,
-            "daily_return_bps": 200,
-            "notional_per_side": 150.0,
-            "daily_pnl_stop_loss": 200.0,
-            "trailing_take_profit": 0.05,
-            "trailing_stop_loss": 0.02,
-            "hedge_only_mode": False,
-            "force_quote_refresh_interval": 100,
-            "max_long_usd": 10000.0,
-            "max_short_usd": 10000.0,
-            "enable_trading": enable_trading,
-            "quote_levels": quote_levels
-        }
-        
-        # Add vault address if provided
-        if vault_address:
-            config["vault_address"] = vault_address
-            print(f"Using vault address: {vault_address}")
-        
-        # Connect to Redis
-        print(f"Connecting to Redis at {redis_url}")
-        r = redis.Redis.from_url(redis_url)
-        
-        # Test Redis connection
-        r.ping()
-        print("Connected to Redis successfully")
-        
-        # Convert config to JSON
-        config_json = json.dumps(config)
-        
-        # Set the value directly in Redis with the correct key format
-        key = f"config:{symbol}"
-        r.set(key, config_json)
-        print(f"Stored configuration for {symbol} directly in Redis with key '{key}'")
-        print(f"Configuration: {config_json}")
-        
-        # Print detail about the quote levels
-        print("\nQuote Levels:")
-        for level in quote_levels:
-            print(f"  Level {level['level']}: Spread Multiplier = {level['spread_multiplier']}x, Size Multiplier = {level['size_multiplier']}x")
-        
-        return True
-    except redis.exceptions.ConnectionError as e:
-        print(f"Error connecting to Redis: {e}", file=sys.stderr)
-        return False
-    except Exception as e:
-        print(f"Error: {e}", file=sys.stderr)
-        return False
+from _mm_redis import CONFIG_CHANNEL, dumps, get_client, report_errors
 
-if __name__ == "__main__":
+def quote_levels_for(num_levels):
+    """Return a fresh list of quote levels for num_levels; each level widens the spread
+    (1.0x, 2.0x, ...) and shrinks the size (1.5x, 0.75x, 0.5x, ...)."""
+    return [
+        {"level": i, "spread_multiplier": float(i), "size_multiplier": 1.5 / i}
+        for i in range(1, num_levels + 1)
+    ]
+
+@functools.lru_cache(maxsize=32)
+def _quote_levels_json(num_levels):
+    """Return the encoded quote levels for num_levels, so repeated configs skip re-encoding them."""
+    return dumps(quote_levels_for(num_levels))
+
+def build_config(symbol, enable_trading=False, vault_address=None):
+    """Build the sample market making configuration for a single symbol, without quote levels."""
+    config = {
+        "symbol": symbol,
+        "daily_return_bps": 200,
+        "notional_per_side": 150.0,
+        "daily_pnl_stop_loss": 200.0,
+        "trailing_take_profit": 0.05,
+        "trailing_stop_loss": 0.02,
+        "hedge_only_mode": False,
+        "force_quote_refresh_interval": 100,
+        "max_long_usd": 10000.0,
+        "max_short_usd": 10000.0,
+        "enable_trading": enable_trading
+    }
+    
+    # Add vault address if provided
+    if vault_address:
+        config["vault_address"] = vault_address
+    
+    return config
+
+def encode_config(symbol, num_levels=1, enable_trading=False, vault_address=None):
+    """Encode the configuration for symbol as JSON bytes, splicing in the cached quote levels."""
+    config_json = dumps(build_config(symbol, enable_trading, vault_address))
+    # Drop the closing brace of the object and append the pre-encoded quote levels
+    return config_json[:-1] + b',"quote_levels":' + _quote_levels_json(num_levels) + b'}'
+
+@report_errors
+def send_config(redis_url, symbols="BTC", num_levels=1, enable_trading=False, vault_address=None, client=None):
+    """Connect to Redis, store a test configuration for one or more symbols and publish it to the market maker."""
+    # Accept a single symbol as well as a list of symbols
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    
+    if not symbols:
+        raise ValueError("At least one symbol is required")
+    
+    if vault_address:
+        print(f"Using vault address: {vault_address}")
+    
+    # Connect to Redis
+    r = client if client is not None else get_client(redis_url)
+    
+    # Queue a SET with the correct key format plus a PUBLISH on the config channel for
+    # each symbol, so the market maker is notified in the same round trip as the write
+    stored = []
+    with r.pipeline(transaction=False) as pipe:
+        for symbol in symbols:
+            key = f"config:{symbol}"
+            config_json = encode_config(symbol, num_levels, enable_trading, vault_address)
+            pipe.set(key, config_json)
+            pipe.publish(CONFIG_CHANNEL, config_json)
+            stored.append((symbol, key, config_json))
+        pipe.execute()
+    
+    for symbol, key, config_json in stored:
+        print(f"Stored configuration for {symbol} in Redis with key '{key}' and published it on {CONFIG_CHANNEL}")
+        print(f"Configuration: {config_json.decode('utf-8')}")
+    
+    # Print detail about the quote levels
+    print("\nQuote Levels:")
+    for level in quote_levels_for(num_levels):
+        print(f"  Level {level['level']}: Spread Multiplier = {level['spread_multiplier']}x, Size Multiplier = {level['size_multiplier']}x")
+    
+    return True
+
+def main(argv=None):
+    """Parse command line arguments and run the script, returning the exit code."""
     parser = argparse.ArgumentParser(description="Send test configuration to market maker")
     parser.add_argument("--redis-url", default="redis://localhost:6379", help="Redis URL")
     parser.add_argument("--symbol", default="BTC", help="Trading symbol to configure")
+    parser.add_argument("--symbols", help="Comma-separated list of trading symbols to configure (overrides --symbol)")
     parser.add_argument("--levels", type=int, default=1, help="Number of quote levels to configure")
     parser.add_argument("--enable-trading", action="store_true", help="Enable actual trading")
     parser.add_argument("--vault-address", help="Ethereum address of the vault to use for trading")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    
+    if args.symbols:
+        symbols = [symbol.strip() for symbol in args.symbols.split(",") if symbol.strip()]
+        if not symbols:
+            parser.error("--symbols must list at least one symbol")
+    else:
+        symbols = [args.symbol]
     
-    success = send_config(args.redis_url, args.symbol, args.levels, args.enable_trading, args.vault_address)
-    sys.exit(0 if success else 1) 
\ No newline at end of file
+    success = send_config(args.redis_url, symbols, args.levels, args.enable_trading, args.vault_address)
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file